@@ -1,66 +1,101 @@
 """A flake8 plugin to check for numbers and their readability."""
 
 import ast
-from dataclasses import dataclass
+import codecs
+import functools
+import re
+from array import array
 from importlib import metadata
-from typing import Any, Iterable, Optional, Tuple, Type
+from typing import Any, ClassVar, Iterable, Optional, Tuple, Type
 
+ErrorReport = Tuple[int, int, str]
+"""An error report, as a tuple of the form (line, column, message)."""
 
-@dataclass
-class ErrorReport:
-    """A class to represent an error report."""
 
-    line: int
-    """The line number of the error."""
+_PREFIX_BASES = {b"0b": 2, b"0B": 2, b"0o": 8, b"0O": 8, b"0x": 16, b"0X": 16}
+"""The bases of the numeric literal prefixes."""
 
-    column: int
-    """The column number of the error."""
 
-    message: str
-    """The error message."""
+_LINE_BREAK = re.compile(rb"\r\n?|\n")
+"""A pattern matching the line breaks Python accepts in source files."""
 
 
-def _base_value(number_literal: str) -> int:
-    """Get the base value of the given number literal.
+_SEPARATOR_MODULOS = {2: 4, 8: 4, 16: 4}
+"""The separator modulos by base, for bases other than the default of 3 digits.
 
-    Args:
-        number_literal: The number literal to get the base value of.
+Note: This is kept as a table to make that part of the code more readable, as well
+as open up the possibility of making this configurable in the future.
+"""
+
+
+_WELL_FORMATTED_FRAGMENTS = {
+    modulo: re.compile(
+        rb"[+-]?_?[0-9a-fA-F]{1,%d}(?:_[0-9a-fA-F]{%d})*" % (modulo, modulo)
+    )
+    for modulo in (3, 4)
+}
+"""Patterns matching well formatted literal fragments, by separator modulo.
+
+An underscore is allowed right after a base prefix, e.g. in `0x_DEAD_BEEF`.
+"""
+
+
+_DIGIT = re.compile(rb"[0-9]")
+"""A pattern matching any decimal digit."""
+
+
+_NUM01_MESSAGE = (
+    "NUM01: Use underscores every {modulo} digits in large numeric literals"
+    " ({literal}) for better readability."
+)
+"""The message template for badly formatted numeric literals."""
 
-    Returns:
-        The base value of the given number literal.
-    """
-    lower_number_literal = number_literal.lower()
-    if lower_number_literal.startswith("0b"):
-        return 2
-    if lower_number_literal.startswith("0o"):
-        return 8
-    if lower_number_literal.startswith("0x"):
-        return 16
-    return 10
 
+@functools.lru_cache(maxsize=4_096)
+def _validate_literal(literal: bytes) -> Optional[str]:
+    """Check that the given numeric literal uses underscores at every modulo position.
 
-def _separator_modulo_for_base(base: int) -> int:
-    """Get the separator modulo for the given base.
+    Every part of the literal's fragments (integer, fractional and exponent part) that
+    is separated by an underscore must be of length modulo. The first part of each
+    fragment is allowed to be shorter than modulo.
 
-    Note: We keep this currently as helper function, to make that part of the code
-    more readable as well as open up the possibility of making this configurable
-    in the future.
+    The result only depends on the literal text, so it is cached, as the same
+    literals are commonly repeated many times in a code base.
 
     Args:
-        base: The base to get the separator modulo for.
+        literal: The numeric literal to check.
 
     Returns:
-        The separator modulo for the given base.
+        The error message if the literal is not well formatted.
     """
-    match base:
-        case 2:
-            return 4
-        case 8:
-            return 4
-        case 16:
-            return 4
-        case _:
-            return 3
+    base_value = _PREFIX_BASES.get(literal[:2], 10)
+    separator_modulo = _SEPARATOR_MODULOS.get(base_value, 3)
+
+    parts: list[bytes] = []
+    if base_value != 10:
+        parts = [literal[2:]]  # Remove the prefix
+    else:
+        exponent_index = literal.find(b"e")
+        if exponent_index == -1:
+            exponent_index = literal.find(b"E")
+        mantissa_end = exponent_index if exponent_index != -1 else len(literal)
+        point_index = literal.find(b".", 0, mantissa_end)
+        if point_index == -1:
+            parts = [literal[:mantissa_end]]
+        else:
+            parts = [literal[:point_index], literal[point_index + 1 : mantissa_end]]
+        if exponent_index != -1:
+            parts.append(literal[exponent_index + 1 :])
+
+    pattern = _WELL_FORMATTED_FRAGMENTS[separator_modulo]
+    for part in parts:
+        # Fragments may be empty, e.g. the fractional part of `1.` or integer part of `.5`.
+        if part and not pattern.fullmatch(part):
+            return _NUM01_MESSAGE.format(
+                modulo=separator_modulo, literal=literal.decode("ascii", "replace")
+            )
+
+    return None
 
 
 class Flake8NumbersChecker:
@@ -70,6 +105,11 @@ class Flake8NumbersChecker:
     version = metadata.version("flake8-numbers")
     off_by_default = False
 
+    _handlers: ClassVar[dict[type[ast.AST], tuple[str, ...]]] = {
+        ast.Constant: ("check_constant",)
+    }
+    """The names of the checks to run on the nodes of the tree, by node type."""
+
     # Important: The parameter names must match exactly the way how flake8 expects them.
     # This is sadly undocumented and we only found out by looking into the source code.
     # But it is what it is.
@@ -82,21 +122,42 @@ class Flake8NumbersChecker:
         """
         self._tree = tree
         self._filename = filename
-        self._source_lines: Optional[list[str]] = None
+        self._source: Optional[bytes] = None
+        self._line_offsets: Optional["array[int]"] = None
 
     @property
-    def source_lines(self) -> list[str]:
-        """Get the source lines of the file being checked.
+    def source(self) -> bytes:
+        """Get the raw source of the file being checked.
 
         This value is cached on-demand.
 
         Returns:
-            The source lines of the file being checked.
+            The raw source of the file being checked.
         """
-        if self._source_lines is None:
-            with open(self._filename, "r", encoding="utf-8") as source_file:
-                self._source_lines = source_file.readlines()
-        return self._source_lines
+        if self._source is None:
+            with open(self._filename, "rb") as source_file:
+                self._source = source_file.read()
+        return self._source
+
+    @property
+    def line_offsets(self) -> "array[int]":
+        """Get the byte offsets at which each line of the file being checked starts.
+
+        This value is cached on-demand.
+
+        Returns:
+            The byte offset of the start of each line, indexed by line number - 1.
+        """
+        if self._line_offsets is None:
+            source = self.source
+            # flake8 strips the BOM before parsing, so line 1 starts after it.
+            first_line = (
+                len(codecs.BOM_UTF8) if source.startswith(codecs.BOM_UTF8) else 0
+            )
+            offsets = array("L", [first_line])
+            offsets.extend(match.end() for match in _LINE_BREAK.finditer(source))
+            self._line_offsets = offsets
+        return self._line_offsets
 
     def run(self) -> Iterable[Tuple[int, int, str, Type[Any]]]:
         """Run the checker.
@@ -104,70 +165,45 @@ class Flake8NumbersChecker:
         Yields:
             A tuple of the form (line, column, message, type).
         """
+        # Files without any digits can't contain numeric literals, and scanning the
+        # source for them is much cheaper than walking the tree.
+        if _DIGIT.search(self.source) is None:
+            return
+
+        handlers = self._handlers
         for node in ast.walk(self._tree):
-            if isinstance(node, ast.Constant):
-                if result := self.check_constant(node):
-                    yield (
-                        result.line,
-                        result.column,
-                        result.message,
-                        Flake8NumbersChecker,
-                    )
-
-    def _extract_code(self, node: ast.AST) -> str:
+            handler_names = handlers.get(type(node))
+            if handler_names is None:
+                continue
+            for handler_name in handler_names:
+                if result := getattr(self, handler_name)(node):
+                    line, column, message = result
+                    yield (line, column, message, Flake8NumbersChecker)
+
+    def _extract_code(self, node: ast.expr) -> Optional[bytes]:
         """Extract the code of the given AST node.
 
+        Note: The column offsets of AST nodes are UTF-8 byte offsets, so the code is
+        sliced from the raw source. It is left undecoded, as numeric literals are
+        pure ASCII.
+
         Args:
             node: The AST node to extract the code from.
 
         Returns:
-            The code of the given AST node.
+            The raw code of the given AST node, or None if its end position is unknown.
         """
-        start_line, start_col = node.lineno, node.col_offset
         end_line, end_col = node.end_lineno, node.end_col_offset
-        original_code = "".join(
-            line[start_col:end_col].strip()
-            for line in self.source_lines[start_line - 1 : end_line]
-        )
-        return original_code
-
-    def _check_underscore_modulos(
-        self,
-        fragment: str,
-        original_literal: str,
-        modulo: int,
-        node: ast.Constant,
-    ) -> Optional[ErrorReport]:
-        """Check the given fragment for underscores at every modulo position.
-
-        Every part of the fragemnt that is separated by an underscore must be of length modulo.
-        The first part of the fragment is allowed to be shorter than modulo.
-
-        Args:
-            fragment: The fragment to check.
-            original_literal: The original literal that the fragment was extracted from.
-            modulo: The modulo to check for (e.g. 3 or 4).
-            node: The AST node to check.
-
-        Returns:
-            An ErrorReport if the fragment is not well formatted.
-        """
-        parts = fragment.split("_")
-        for i, part in enumerate(parts):
-            invalid_first_part = i == 0 and len(part) > modulo
-            invalid_continuation_part = i != 0 and len(part) != modulo
-            if invalid_first_part or invalid_continuation_part:
-                message = (
-                    f"NUM01: Use underscores every {modulo} digits in large numeric literals"
-                    + f" ({original_literal}) for better readability."
-                )
-                return ErrorReport(
-                    line=node.lineno,
-                    column=node.col_offset,
-                    message=message,
-                )
-
-        return None
+        if end_line is None or end_col is None:
+            return None
+        line_offsets = self.line_offsets
+        start = line_offsets[node.lineno - 1] + node.col_offset
+        # Numeric literals always fit on a single line, so avoid the second lookup.
+        if end_line == node.lineno:
+            end = start + end_col - node.col_offset
+        else:
+            end = line_offsets[end_line - 1] + end_col
+        return self.source[start:end]
 
     def check_constant(self, node: ast.Constant) -> Optional[ErrorReport]:
         """Check for the readability of the given numeric literal.
@@ -178,41 +214,26 @@ class Flake8NumbersChecker:
         Returns:
             An ErrorReport if the node is a number literal that is not well formatted.
         """
-        if type(node.value) not in (int, float):
+        # NB: True and False are also of type Constant, but are not numeric literals.
+        #     As bool is a subclass of int, the exact type has to be compared.
+        value_type = type(node.value)
+        if value_type is not int and value_type is not float:
             return None
 
-        original_literal = self._extract_code(node)
-
-        # NB: We have to check for True and False here, because they are also of type
-        #     Constant, but are not numeric literals.
-        #     We cannot simply use ast.Num, because that was deprecated.
-        if original_literal in ["True", "False"]:
+        # The shortest literals that can be badly formatted are 3 characters long,
+        # e.g. `1_0`, so shorter ones can be skipped without extracting their code.
+        # Note that the value can't be used for this, as `0b1111100111` is `999`.
+        if (
+            node.end_col_offset is not None
+            and node.end_lineno == node.lineno
+            and node.end_col_offset - node.col_offset < 3
+        ):
             return None
 
-        base_value = _base_value(original_literal)
-        separator_modulo = _separator_modulo_for_base(base_value)
-        is_decimal = base_value == 10
-
-        is_science_notation = is_decimal and "e" in original_literal.lower()
-        is_float = "." in original_literal
-
-        parts: list[str] = []
-        if is_science_notation:
-            e_parts: list[str] = original_literal.split("e")
-            frac_parts: list[str] = e_parts[0].split(".")
-            parts = frac_parts + [e_parts[1]]
-        elif is_float:
-            parts = original_literal.split(".")
-        elif not is_decimal:
-            parts = [original_literal[2:]]  # Remove the prefix
-        else:
-            parts = [original_literal]
-            # assert False, "This should never happen"
-
-        for part in parts:
-            if error := self._check_underscore_modulos(
-                part, original_literal, separator_modulo, node
-            ):
-                return error
+        original_literal = self._extract_code(node)
+        if original_literal is None:
+            return None
 
+        if message := _validate_literal(original_literal):
+            return (node.lineno, node.col_offset, message)
         return None
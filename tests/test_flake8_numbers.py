@@ -33,6 +33,24 @@ def _check_code(code: str) -> list[tuple[int, int, str, type]]:
         # return list(checker.run())
 
 
+def _check_source(source: bytes) -> list[tuple[int, int, str, type]]:
+    """Check the raw source of a file for errors.
+
+    Args:
+        source: Raw source of the file to check.
+
+    Returns:
+        List of errors.
+    """
+    with tempfile.NamedTemporaryFile(mode="wb") as file:
+        file.write(source)
+        file.flush()
+        # flake8 strips the BOM before parsing, so the AST offsets don't include it.
+        tree = ast.parse(source.decode("utf-8-sig"), file.name)
+        checker = check_numbers.Flake8NumbersChecker(tree, file.name)
+        return list(checker.run())
+
+
 def _check_okay(code: str) -> None:
     """Check that code is okay.
 
@@ -65,6 +83,7 @@ def test_decimal() -> None:
     _check_fail("1000")
     _check_fail("10000")
     _check_fail("100_00")
+    _check_fail("1_0")
 
 
 def test_octal() -> None:
@@ -95,9 +114,13 @@ def test_floating_point_decimal() -> None:
     _check_okay("123_456_789.12_345")
     _check_okay("123_456_789.123_456_789")
     _check_okay("-123_456_789.123_456_789")
+    _check_okay("1_000.")
+    _check_okay(".123_456")
     _check_fail("123_4567_89.123_456_789")
     _check_fail("123_456_789.123456789")
     _check_fail("123_456_789.123456_789")
+    _check_fail("1000.")
+    _check_fail(".123456")
 
 
 def test_hexadecimal() -> None:
@@ -107,20 +130,86 @@ def test_hexadecimal() -> None:
     _check_okay("0x123")
     _check_okay("0xDEAD")
     _check_okay("0xDEAD_BEEF")
+    _check_okay("0x_DEAD_BEEF")
     _check_okay("0xA_DEAD_BEEF")
     _check_okay("0xAA_DEAD_BEEF")
     _check_okay("0xAAA_DEAD_BEEF")
     _check_okay("-0xAAA_DEAD_BEEF")
+    _check_okay("0XAAA_DEAD_BEEF")
     _check_fail("0xDEADBEEF")
     _check_fail("0xAAA_DE_AD_BEEF")
     _check_fail("0xAAA_DEAD_BE_EF")
+    _check_fail("0XDEADBEEF")
 
 
 def test_binary() -> None:
     """Test that binary numbers are flagged."""
     _check_okay("0b1010")
     _check_okay("0b1010_1010")
+    _check_okay("0b_1010_1010")
     _check_okay("0b1010_1010_1010")
     _check_okay("-0b1010_1010_1010")
     _check_fail("0b10101010")
     _check_fail("0b1010_10101010")
+    _check_fail("0b1111100111")
+
+
+def test_nested_constants() -> None:
+    """Test that numeric literals nested in other expressions are checked."""
+    _check_okay("[1_000, (2_000, {'a': 3_000})]")
+    _check_okay("f(1_000, key=2_000)")
+    _check_fail("[1000, (2000, {'a': 3_000})]", count=2)
+    _check_fail("f(1000, key=2000)", count=2)
+
+
+def test_science_notation() -> None:
+    """Test scientific notation, in both lower and upper case."""
+    _check_okay("1e10")
+    _check_okay("1E10")
+    _check_okay("1_000.5e10")
+    _check_okay("1_000.5E10")
+    _check_okay("1e-100")
+    _check_okay("1e+100")
+    _check_fail("1000.5e10")
+    _check_fail("1000.5E10")
+    _check_fail("1.5E1000")
+    _check_fail("1e-1000")
+
+
+def test_non_ascii_source() -> None:
+    """Test that literals are extracted correctly after non-ASCII characters."""
+    _check_okay("('äöü€', 1_000)")
+    _check_okay("('äöü€', 0xDEAD_BEEF)")
+    _check_fail("('äöü€', 1000)")
+    _check_fail("('äöü€', 0xDEADBEEF)")
+
+
+def test_error_report() -> None:
+    """Test the position and message of a reported error."""
+    assert _check_code("0xDEADBEEF") == [
+        (
+            1,
+            6,
+            "NUM01: Use underscores every 4 digits in large numeric literals"
+            + " (0xDEADBEEF) for better readability.",
+            check_numbers.Flake8NumbersChecker,
+        )
+    ]
+
+
+def test_line_endings() -> None:
+    """Test that literals are found with all the line endings Python accepts."""
+    for line_ending in (b"\n", b"\r\n", b"\r"):
+        source = line_ending.join([b"a = 1", b"b = 'x'", b"c = 10000", b""])
+        assert [error[:2] for error in _check_source(source)] == [(3, 4)]
+
+
+def test_byte_order_mark() -> None:
+    """Test that literals are found in files starting with a UTF-8 BOM."""
+    assert [error[:2] for error in _check_source(b"\xef\xbb\xbf1000000 + x\n")] == [
+        (1, 0)
+    ]
+    assert [error[:2] for error in _check_source(b"\xef\xbb\xbfx=10000000\n")] == [
+        (1, 2)
+    ]
+    assert not _check_source(b"\xef\xbb\xbfx=10_000_000\n")